@@ -0,0 +1,80 @@
+"""
+Serialized /data payload, optionally shared across instances through Upstash Redis.
+"""
+import os
+import threading
+
+import orjson
+
+from lib.data import fetch_all_data
+
+# --- Shared response cache (Upstash Redis) ---
+# The edge cache is per region and is emptied by redeploys, so the serialized /data payload
+# is also kept in Redis: a fresh copy for 15 min and a stale copy for a day.
+REDIS_FRESH_KEY = 'stocks:nifty100:v1'
+REDIS_STALE_KEY = 'stocks:nifty100:v1:stale'
+REDIS_LOCK_KEY = 'stocks:nifty100:v1:lock'
+REDIS_FRESH_TTL = 900
+REDIS_STALE_TTL = 86400
+REDIS_LOCK_TTL = 120
+# Redis is optional; it is only used when upstash-redis and its credentials are present.
+REDIS = None
+if os.environ.get('UPSTASH_REDIS_REST_URL') and os.environ.get('UPSTASH_REDIS_REST_TOKEN'):
+    try:
+        from upstash_redis import Redis
+        REDIS = Redis(url=os.environ['UPSTASH_REDIS_REST_URL'], token=os.environ['UPSTASH_REDIS_REST_TOKEN'])
+    except ImportError:
+        print("upstash-redis is not installed; the shared cache is disabled.")
+
+def _serialize(data):
+    # orjson is much faster than the stdlib encoder and writes NaN as null instead of invalid JSON
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def _build_payload():
+    return _serialize(fetch_all_data())
+
+def _refresh_redis():
+    data = fetch_all_data()
+    payload = _serialize(data)
+    # An empty result usually means upstream throttling; keep the cached copies for that case
+    if not data['data']:
+        print("  - Fetched no stocks; leaving the Redis cache untouched.")
+        return payload
+    try:
+        body = payload.decode()
+        REDIS.set(REDIS_FRESH_KEY, body, ex=REDIS_FRESH_TTL)
+        REDIS.set(REDIS_STALE_KEY, body, ex=REDIS_STALE_TTL)
+    except Exception as e:
+        print(f"  - Failed to store data in Redis: {e}")
+    return payload
+
+def _refresh_redis_in_background():
+    # The lock key stops every instance that sees a stale entry from refetching at once
+    try:
+        if not REDIS.set(REDIS_LOCK_KEY, 1, nx=True, ex=REDIS_LOCK_TTL):
+            return
+    except Exception:
+        return
+    threading.Thread(target=_refresh_redis, daemon=True).start()
+
+def get_payload():
+    """
+    Returns the serialized /data payload, served from Redis when it is configured.
+    A stale entry is returned immediately while a background thread fetches a new one.
+    """
+    if REDIS is None:
+        return _build_payload()
+
+    try:
+        fresh = REDIS.get(REDIS_FRESH_KEY)
+        stale = None if fresh else REDIS.get(REDIS_STALE_KEY)
+    except Exception as e:
+        print(f"  - Failed to read data from Redis: {e}")
+        return _build_payload()
+
+    if fresh:
+        return fresh.encode()
+    if stale:
+        _refresh_redis_in_background()
+        return stale.encode()
+    return _refresh_redis()
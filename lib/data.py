@@ -0,0 +1,419 @@
+"""
+Data fetching and analytics for the Nifty 100 dashboard.
+
+Heavy third-party modules (yfinance and the pandas stack it pulls in, BeautifulSoup,
+httpx, TA-Lib) are imported inside the functions that need them, so serving the
+static page does not pay for them on a cold start.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import asyncio
+import csv
+import functools
+import io
+import re
+import threading
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls out to at most `rate` per second.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+# --- Concurrency settings ---
+# Fetching is network-bound, so symbols are processed by a thread pool.
+# Each upstream host gets its own semaphore to keep us polite, and yfinance
+# calls are additionally rate limited since Yahoo throttles bursts.
+MAX_WORKERS = 16
+YFINANCE_SEMAPHORE = threading.Semaphore(8)
+YFINANCE_LIMITER = RateLimiter(10)
+SCREENER_CONCURRENCY = 4
+SCREENER_SEMAPHORE = threading.Semaphore(SCREENER_CONCURRENCY)
+
+# --- Shared HTTP session ---
+# One pooled session keeps keep-alive connections to screener.in warm across workers.
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+))
+
+# --- Pledge cache ---
+# Pledge data comes from quarterly filings, so a warm instance can reuse it for a day.
+# Entries older than PLEDGE_REFRESH_AGE are still served but refreshed in the background.
+PLEDGE_CACHE_TTL = 24 * 3600
+PLEDGE_REFRESH_AGE = 12 * 3600
+_PLEDGE_CACHE = TTLCache(maxsize=256, ttl=PLEDGE_CACHE_TTL)
+_PLEDGE_CACHE_LOCK = threading.Lock()
+_PLEDGE_REFRESHING = set()
+
+# Matches the "Pledged percentage" ratio in screener.in's raw HTML, e.g.
+# <span class="name">Pledged percentage</span><span class="nowrap value"><span class="number">1.23</span>
+_PLEDGE_RE = re.compile(
+    r'Pledge[^<]*</span>\s*(?:<span[^>]*>\s*)*?<span class="number">\s*([\d.]+)',
+    re.IGNORECASE,
+)
+
+# --- Nifty 100 constituents cache ---
+# Index membership only changes quarterly, so a fetched list is reused for a day.
+SYMBOLS_CACHE_TTL = 24 * 3600
+_SYMBOLS_CACHE = {'ts': 0, 'syms': None}
+
+# --- Nifty 100 constituents ---
+def get_nifty100_symbols():
+    """
+    Scrapes the list of Nifty 100 symbols from a reliable source.
+    Using a well-maintained GitHub repo is often more stable than scraping NSE directly.
+    """
+    if _SYMBOLS_CACHE['syms'] and time.time() - _SYMBOLS_CACHE['ts'] < SYMBOLS_CACHE_TTL:
+        return _SYMBOLS_CACHE['syms']
+
+    try:
+        # This URL points to a CSV file with the Nifty 100 constituents
+        url = "https://raw.githubusercontent.com/piyush-eon/trading-scripts/master/data/ind_nifty100list.csv"
+        response = SESSION.get(url, timeout=5)
+        response.raise_for_status()
+        # The 'Symbol' column contains the stock tickers we need
+        reader = csv.DictReader(io.StringIO(response.text))
+        symbols = [row['Symbol'].strip() for row in reader if row.get('Symbol')]
+        print(f"Successfully fetched {len(symbols)} Nifty 100 symbols.")
+        _SYMBOLS_CACHE['ts'] = time.time()
+        _SYMBOLS_CACHE['syms'] = symbols
+        return symbols
+    except Exception as e:
+        print(f"CRITICAL: Failed to fetch Nifty 100 stock list: {e}")
+        print("Falling back to a hardcoded list.")
+        # --- Fallback list in case the scrape fails ---
+        return [
+            'ADANIENT', 'ADANIGREEN', 'ADANIPORTS', 'ADANIPOWER', 'AMBUJACEM', 
+            'APOLLOHOSP', 'ASIANPAINT', 'AXISBANK', 'BAJAJ-AUTO', 'BAJFINANCE', 
+            'BAJAJFINSV', 'BPCL', 'BHARTIARTL', 'BRITANNIA', 'CIPLA', 'COALINDIA', 
+            'DIVISLAB', 'DRREDDY', 'EICHERMOT', 'GRASIM', 'HCLTECH', 'HDFCBANK', 
+            'HDFCLIFE', 'HEROMOTOCO', 'HINDALCO', 'HINDUNILVR', 'ICICIBANK', 
+            'ITC', 'INDUSINDBK', 'INFY', 'JSWSTEEL', 'KOTAKBANK', 'LTIM', 'LT', 
+            'M&M', 'MARUTI', 'NTPC', 'NESTLEIND', 'ONGC', 'POWERGRID', 'RELIANCE', 
+            'SBILIFE', 'SBIN', 'SUNPHARMA', 'TCS', 'TATACONSUM', 'TATAMOTORS', 
+            'TATASTEEL', 'TECHM', 'TITAN', 'ULTRACEMCO', 'WIPRO', 'ZOMATO',
+            'DMART', 'BAJAJHLDNG', 'ICICIGI', 'TRENT'
+        ]
+
+
+# --- Analytics: RSI, pledge and recommendations ---
+
+def _wilder_rsi(close, window):
+    """
+    Wilder's RSI (the TradingView convention) for closing prices along axis 0.
+    A 1-D array gives a single value; a (days, symbols) array gives one value per column.
+    The recursive smoothing is expanded into a single weighted sum, so there is no Python loop.
+    """
+    if close is None or len(close) < window + 1: return None
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.diff(close, axis=0)
+    up = np.clip(delta, 0, None)
+    down = np.clip(-delta, 0, None)
+
+    # Seed with the simple mean of the first window, then apply
+    # avg = avg * (1 - alpha) + value * alpha for every remaining value.
+    alpha = 1.0 / window
+    steps = delta.shape[0] - window
+    weights = alpha * (1 - alpha) ** np.arange(steps - 1, -1, -1)
+    seed_decay = (1 - alpha) ** steps
+    avg_up = up[:window].mean(axis=0) * seed_decay + weights @ up[window:]
+    avg_down = down[:window].mean(axis=0) * seed_decay + weights @ down[window:]
+
+    # No losses at all means an RSI of 100
+    rs = np.divide(avg_up, avg_down, out=np.full_like(avg_up, np.inf), where=avg_down != 0)
+    return 100 - 100 / (1 + rs)
+
+@functools.lru_cache(maxsize=None)
+def _load_talib():
+    # TA-Lib needs its C library, which isn't always available (e.g. on Vercel).
+    # Use it when installed, otherwise fall back to the NumPy implementation above.
+    try:
+        import talib
+    except ImportError:
+        return None
+    return talib
+
+def calculate_rsi(close, window=14):
+    if close is None or len(close) < window + 1: return None
+    talib = _load_talib()
+    if talib is None: return float(_wilder_rsi(close, window))
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    # TA-Lib returns 0 for a flat series (no gains or losses), where _wilder_rsi gives 100.
+    # Return 100 whenever there are no losses so both backends agree.
+    if not (np.diff(close) < 0).any(): return 100.0
+    out = talib.RSI(close, timeperiod=window)
+    return None if np.isnan(out[-1]) else float(out[-1])
+
+def calculate_rsi_batch(all_hist, window=14):
+    """
+    RSI for every symbol in a batched yf.download frame, keyed by symbol.
+    Symbols with a full price history are computed together in one 2-D pass;
+    the few with gaps fall back to calculate_rsi on their own closes.
+    """
+    if all_hist is None or all_hist.empty:
+        return {}
+    closes = all_hist.xs('Close', axis=1, level=1).dropna(how='all')
+    symbols = [ticker.removesuffix('.NS') for ticker in closes.columns]
+    # Symbols too short for an RSI (fresh listings, data gaps) get None without any computation
+    rsi_by_symbol = dict.fromkeys(symbols)
+    if len(closes) < window + 1:
+        return rsi_by_symbol
+    counts = closes.count().to_numpy()
+    complete = counts == len(closes)
+
+    if complete.any():
+        values = _wilder_rsi(closes.loc[:, complete].to_numpy(), window)
+        complete_symbols = [symbol for symbol, ok in zip(symbols, complete) if ok]
+        rsi_by_symbol.update(zip(complete_symbols, values.tolist()))
+    for symbol, column, count, ok in zip(symbols, closes.columns, counts, complete):
+        if not ok and count >= window + 1:
+            rsi_by_symbol[symbol] = calculate_rsi(closes[column].dropna().to_numpy(), window)
+    return rsi_by_symbol
+
+def _pledge_url(symbol):
+    return f"https://www.screener.in/company/{symbol}/consolidated/"
+
+def _parse_pledge(response):
+    match = _PLEDGE_RE.search(response.text)
+    if match:
+        return float(match.group(1))
+
+    # Fall back to parsing the HTML in case the markup has changed. Only <li> elements
+    # are built into the tree, and passing bytes lets lxml detect the encoding itself.
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(response.content, 'lxml', parse_only=SoupStrainer('li'))
+    pledge_span = soup.select_one('li.flex-space-between:-soup-contains("Pledge") span.number')
+    return float(pledge_span.text.strip()) if pledge_span else 0.0
+
+def _scrape_pledge(symbol):
+    with SCREENER_SEMAPHORE:
+        response = SESSION.get(_pledge_url(symbol), headers=HEADERS, timeout=(3, 5))
+    response.raise_for_status()
+    return _parse_pledge(response)
+
+def _store_pledge(symbol, pledge):
+    with _PLEDGE_CACHE_LOCK:
+        _PLEDGE_CACHE[symbol] = (time.time(), pledge)
+
+def _refresh_pledge(symbol):
+    """
+    Scrapes the pledge for a symbol and stores it in the cache.
+    Failures are not cached so the next request tries again.
+    """
+    try:
+        pledge = _scrape_pledge(symbol)
+    except Exception:
+        return 0.0
+    _store_pledge(symbol, pledge)
+    return pledge
+
+def _refresh_pledge_in_background(symbol):
+    with _PLEDGE_CACHE_LOCK:
+        if symbol in _PLEDGE_REFRESHING:
+            return
+        _PLEDGE_REFRESHING.add(symbol)
+
+    def worker():
+        try:
+            _refresh_pledge(symbol)
+        finally:
+            with _PLEDGE_CACHE_LOCK:
+                _PLEDGE_REFRESHING.discard(symbol)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def get_pledge_percentage(symbol):
+    """
+    Returns the pledge percentage for a symbol, served from the cache when possible.
+    """
+    with _PLEDGE_CACHE_LOCK:
+        cached = _PLEDGE_CACHE.get(symbol)
+    if cached is None:
+        return _refresh_pledge(symbol)
+
+    fetched_at, pledge = cached
+    if time.time() - fetched_at > PLEDGE_REFRESH_AGE:
+        _refresh_pledge_in_background(symbol)
+    return pledge
+
+async def _prefetch_pledges_async(symbols):
+    import httpx
+
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    semaphore = asyncio.Semaphore(SCREENER_CONCURRENCY)
+    async with httpx.AsyncClient(http2=True, headers=HEADERS, timeout=10, limits=limits) as client:
+        async def fetch(symbol):
+            async with semaphore:
+                response = await client.get(_pledge_url(symbol))
+            response.raise_for_status()
+            _store_pledge(symbol, _parse_pledge(response))
+
+        # Failures are left uncached; get_pledge_percentage retries them one by one
+        await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+
+def prefetch_pledges(symbols):
+    """
+    Warms the pledge cache for every symbol not already in it, scraping screener.in
+    over a single async HTTP/2 client instead of one blocking request per worker.
+    """
+    with _PLEDGE_CACHE_LOCK:
+        missing = [symbol for symbol in symbols if symbol not in _PLEDGE_CACHE]
+    if not missing:
+        return
+    # This is only a cache warm-up: if it fails outright, get_pledge_percentage fetches normally
+    try:
+        asyncio.run(_prefetch_pledges_async(missing))
+    except Exception as e:
+        print(f"  - Pledge prefetch failed, falling back to per-symbol scraping: {e}")
+
+def _to_float_array(values):
+    # Missing or non-numeric values become NaN, which fails every comparison below
+    return np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=np.float64)
+
+def get_recommendations(rsi, pe, pledge):
+    """
+    Scores every stock at once from equal-length sequences of RSI, P/E and pledge values.
+    Returns one {"signal", "reason"} dict per stock; reasons are only built for the "Yes" cases.
+    """
+    rsi, pe, pledge = _to_float_array(rsi), _to_float_array(pe), _to_float_array(pledge)
+    rules = [
+        (rsi < 30, 3, "Oversold (RSI < 30)"),
+        ((rsi >= 30) & (rsi < 40), 1, "Approaching Oversold"),
+        ((pe > 0) & (pe < 20), 2, "Low P/E (< 20)"),
+        (pe < 0, -1, "Negative P/E"),
+        ((pledge > 25) & (pledge <= 50), -2, "High Pledge (> 25%)"),
+        (pledge > 50, -4, "Very High Pledge (> 50%)"),
+    ]
+    score = sum(points * mask for mask, points, _ in rules)
+
+    recommendations = [{"signal": "No", "reason": "Neutral or Unfavorable"} for _ in range(len(rsi))]
+    for i in np.flatnonzero(score >= 3):
+        reason = ", ".join(text for mask, _, text in rules if mask[i])
+        recommendations[i] = {"signal": "Yes", "reason": reason}
+    return recommendations
+
+
+def _download_histories(symbols):
+    """
+    Downloads one month of history for every symbol in a single batched yfinance call.
+    """
+    import yfinance as yf
+
+    try:
+        return yf.download(
+            tickers=" ".join(f"{symbol}.NS" for symbol in symbols),
+            period="1mo",
+            group_by='ticker',
+            threads=True,
+            progress=False,
+            auto_adjust=False,
+        )
+    except Exception as e:
+        print(f"  - Batched history download failed: {e}")
+        return None
+
+def _fetch_one(symbol):
+    """
+    Fetches the yfinance info for a single stock. Returns None if the stock should be skipped.
+    RSI and pledge are filled in by fetch_all_data once the batched history and pledge prefetch finish.
+    """
+    import yfinance as yf
+
+    stock_data = {}
+    try:
+        print(f"Fetching data for {symbol}...")
+        ticker = yf.Ticker(f"{symbol}.NS")
+        with YFINANCE_SEMAPHORE:
+            YFINANCE_LIMITER.wait()
+            info = ticker.info
+
+        if not info or 'currentPrice' not in info or info.get('currentPrice') is None:
+            print(f"  - Skipping {symbol} due to missing or invalid data from yfinance.")
+            return None
+
+        # Core Data
+        stock_data['name'] = info.get('longName', symbol)
+        stock_data['symbol'] = symbol
+        stock_data['price'] = info.get('currentPrice', 0)
+        prev_close = info.get('previousClose', 0)
+        stock_data['change'] = stock_data['price'] - prev_close
+        stock_data['pctChange'] = (stock_data['change'] / prev_close) * 100 if prev_close else 0
+
+        # Analytics Data
+        # yfinance sometimes reports trailingPE as a string such as 'Infinity'
+        pe = info.get('trailingPE', None)
+        stock_data['pe'] = pe if isinstance(pe, (int, float)) else None
+
+        return stock_data
+    except Exception as e:
+        print(f"  - Error fetching data for {symbol}: {e}")
+        return None
+
+
+# --- Main data fetch ---
+def fetch_all_data():
+    """
+    Fetches, analyses and scores every Nifty 100 stock: per-symbol info calls, the pledge
+    prefetch and the batched history download all run at the same time.
+    """
+    # 1. Get the latest list of Nifty 100 stocks
+    stock_symbols = get_nifty100_symbols()
+    
+    print(f"--- Starting data fetch for {len(stock_symbols)} stocks ---")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # 2. Start the pledge prefetch and every per-symbol info call at once, and download
+        #    all price histories in one batch while they run; per-host semaphores do the pacing
+        pledges_ready = executor.submit(prefetch_pledges, stock_symbols)
+        info_results = executor.map(_fetch_one, stock_symbols)
+        all_hist = _download_histories(stock_symbols)
+        rsi_by_symbol = calculate_rsi_batch(all_hist)
+        all_stocks_data = [stock_data for stock_data in info_results if stock_data is not None]
+        pledges_ready.result()
+
+        # 3. Pledges now mostly come from the warmed cache; misses are scraped concurrently
+        symbols = [stock_data['symbol'] for stock_data in all_stocks_data]
+        pledges = list(executor.map(get_pledge_percentage, symbols))
+    for stock_data, pledge in zip(all_stocks_data, pledges):
+        stock_data['rsi'] = rsi_by_symbol.get(stock_data['symbol'])
+        stock_data['pledge'] = pledge
+
+    # 4. Score all stocks together
+    recommendations = get_recommendations(
+        [stock_data['rsi'] for stock_data in all_stocks_data],
+        [stock_data['pe'] for stock_data in all_stocks_data],
+        [stock_data['pledge'] for stock_data in all_stocks_data],
+    )
+    for stock_data, recommendation in zip(all_stocks_data, recommendations):
+        stock_data['recommendation'] = recommendation['signal']
+        stock_data['reason'] = recommendation['reason']
+            
+    print("--- Data fetch cycle complete ---")
+    return {
+        "data": all_stocks_data,
+        # ISO-8601 UTC; the browser formats it in Indian market time
+        "last_updated": datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }